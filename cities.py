@@ -0,0 +1,155 @@
+import re
+from collections import Counter
+from functools import lru_cache
+from typing import Optional
+
+# Largest incorporated places per state (US Census Bureau population estimates),
+# used to fill in a contractor's city locally instead of asking the LLM.
+# Texas, the primary market, gets a longer list.
+CITIES_BY_STATE = {
+    "AL": ("Birmingham", "Montgomery", "Huntsville", "Mobile", "Tuscaloosa", "Hoover", "Dothan", "Auburn", "Decatur", "Madison"),
+    "AK": ("Anchorage", "Fairbanks", "Juneau", "Wasilla", "Sitka", "Ketchikan", "Kenai", "Kodiak"),
+    "AZ": ("Phoenix", "Tucson", "Mesa", "Chandler", "Gilbert", "Glendale", "Scottsdale", "Peoria", "Tempe", "Surprise", "Goodyear", "Flagstaff", "Yuma"),
+    "AR": ("Little Rock", "Fayetteville", "Fort Smith", "Springdale", "Jonesboro", "Rogers", "Conway", "North Little Rock", "Bentonville", "Pine Bluff"),
+    "CA": ("Los Angeles", "San Diego", "San Jose", "San Francisco", "Fresno", "Sacramento", "Long Beach", "Oakland", "Bakersfield", "Anaheim", "Santa Ana", "Riverside", "Stockton", "Irvine", "Chula Vista", "Fremont", "San Bernardino", "Modesto", "Fontana", "Oxnard"),
+    "CO": ("Denver", "Colorado Springs", "Aurora", "Fort Collins", "Lakewood", "Thornton", "Arvada", "Westminster", "Pueblo", "Boulder", "Greeley", "Longmont"),
+    "CT": ("Bridgeport", "Stamford", "New Haven", "Hartford", "Waterbury", "Norwalk", "Danbury", "New Britain", "Meriden", "Bristol"),
+    "DE": ("Wilmington", "Dover", "Newark", "Middletown", "Smyrna", "Milford", "Seaford", "Georgetown"),
+    "DC": ("Washington",),
+    "FL": ("Jacksonville", "Miami", "Tampa", "Orlando", "St. Petersburg", "Hialeah", "Port St. Lucie", "Tallahassee", "Cape Coral", "Fort Lauderdale", "Pembroke Pines", "Hollywood", "Gainesville", "Miramar", "Coral Springs", "Clearwater", "Palm Bay", "West Palm Beach", "Lakeland", "Pompano Beach"),
+    "GA": ("Atlanta", "Columbus", "Augusta", "Macon", "Savannah", "Athens", "Sandy Springs", "South Fulton", "Roswell", "Johns Creek", "Warner Robins", "Alpharetta", "Marietta"),
+    "HI": ("Honolulu", "Hilo", "Kailua", "Kapolei", "Kaneohe", "Pearl City", "Waipahu", "Kahului"),
+    "ID": ("Boise", "Meridian", "Nampa", "Idaho Falls", "Caldwell", "Pocatello", "Coeur d'Alene", "Twin Falls", "Post Falls", "Lewiston"),
+    "IL": ("Chicago", "Aurora", "Joliet", "Naperville", "Rockford", "Springfield", "Elgin", "Peoria", "Champaign", "Waukegan", "Cicero", "Bloomington", "Evanston"),
+    "IN": ("Indianapolis", "Fort Wayne", "Evansville", "South Bend", "Carmel", "Fishers", "Bloomington", "Hammond", "Gary", "Lafayette", "Muncie", "Noblesville"),
+    "IA": ("Des Moines", "Cedar Rapids", "Davenport", "Sioux City", "Iowa City", "Ankeny", "West Des Moines", "Ames", "Waterloo", "Council Bluffs", "Dubuque"),
+    "KS": ("Wichita", "Overland Park", "Kansas City", "Olathe", "Topeka", "Lawrence", "Shawnee", "Lenexa", "Manhattan", "Salina", "Hutchinson"),
+    "KY": ("Louisville", "Lexington", "Bowling Green", "Owensboro", "Covington", "Georgetown", "Richmond", "Florence", "Elizabethtown", "Nicholasville", "Frankfort"),
+    "LA": ("New Orleans", "Baton Rouge", "Shreveport", "Lafayette", "Lake Charles", "Kenner", "Bossier City", "Monroe", "Alexandria", "Houma"),
+    "ME": ("Portland", "Lewiston", "Bangor", "South Portland", "Auburn", "Biddeford", "Sanford", "Saco", "Augusta", "Westbrook"),
+    "MD": ("Baltimore", "Frederick", "Gaithersburg", "Rockville", "Bowie", "Hagerstown", "Annapolis", "College Park", "Salisbury", "Laurel", "Columbia", "Silver Spring"),
+    "MA": ("Boston", "Worcester", "Springfield", "Cambridge", "Lowell", "Brockton", "Quincy", "Lynn", "New Bedford", "Fall River", "Newton", "Lawrence", "Somerville"),
+    "MI": ("Detroit", "Grand Rapids", "Warren", "Sterling Heights", "Ann Arbor", "Lansing", "Dearborn", "Clinton Township", "Canton", "Livonia", "Troy", "Westland", "Flint", "Kalamazoo"),
+    "MN": ("Minneapolis", "Saint Paul", "St. Paul", "Rochester", "Duluth", "Bloomington", "Brooklyn Park", "Plymouth", "Woodbury", "Maple Grove", "St. Cloud", "Eagan", "Eden Prairie"),
+    "MS": ("Jackson", "Gulfport", "Southaven", "Biloxi", "Hattiesburg", "Olive Branch", "Tupelo", "Meridian", "Greenville", "Madison"),
+    "MO": ("Kansas City", "St. Louis", "Saint Louis", "Springfield", "Columbia", "Independence", "Lee's Summit", "O'Fallon", "St. Joseph", "St. Charles", "Blue Springs", "Joplin", "Jefferson City"),
+    "MT": ("Billings", "Missoula", "Great Falls", "Bozeman", "Butte", "Helena", "Kalispell", "Havre", "Anaconda", "Miles City"),
+    "NE": ("Omaha", "Lincoln", "Bellevue", "Grand Island", "Kearney", "Fremont", "Hastings", "Norfolk", "North Platte", "Papillion"),
+    "NV": ("Las Vegas", "Henderson", "Reno", "North Las Vegas", "Sparks", "Carson City", "Fernley", "Elko", "Mesquite", "Boulder City"),
+    "NH": ("Manchester", "Nashua", "Concord", "Derry", "Dover", "Rochester", "Salem", "Merrimack", "Hudson", "Londonderry", "Keene", "Portsmouth"),
+    "NJ": ("Newark", "Jersey City", "Paterson", "Elizabeth", "Lakewood", "Edison", "Woodbridge", "Toms River", "Hamilton", "Trenton", "Clifton", "Camden", "Cherry Hill"),
+    "NM": ("Albuquerque", "Las Cruces", "Rio Rancho", "Santa Fe", "Roswell", "Farmington", "Hobbs", "Clovis", "Carlsbad", "Alamogordo"),
+    "NY": ("New York", "Brooklyn", "Queens", "Bronx", "Staten Island", "Buffalo", "Yonkers", "Rochester", "Syracuse", "Albany", "New Rochelle", "Mount Vernon", "Schenectady", "Utica", "White Plains", "Long Island City"),
+    "NC": ("Charlotte", "Raleigh", "Greensboro", "Durham", "Winston-Salem", "Fayetteville", "Cary", "Wilmington", "High Point", "Concord", "Asheville", "Greenville", "Gastonia"),
+    "ND": ("Fargo", "Bismarck", "Grand Forks", "Minot", "West Fargo", "Williston", "Dickinson", "Mandan", "Jamestown", "Wahpeton"),
+    "OH": ("Columbus", "Cleveland", "Cincinnati", "Toledo", "Akron", "Dayton", "Parma", "Canton", "Youngstown", "Lorain", "Hamilton", "Springfield", "Kettering", "Dublin"),
+    "OK": ("Oklahoma City", "Tulsa", "Norman", "Broken Arrow", "Edmond", "Lawton", "Moore", "Midwest City", "Enid", "Stillwater", "Owasso"),
+    "OR": ("Portland", "Salem", "Eugene", "Gresham", "Hillsboro", "Bend", "Beaverton", "Medford", "Springfield", "Corvallis", "Albany", "Tigard"),
+    "PA": ("Philadelphia", "Pittsburgh", "Allentown", "Reading", "Erie", "Scranton", "Bethlehem", "Lancaster", "Harrisburg", "York", "Wilkes-Barre", "State College", "Altoona"),
+    "RI": ("Providence", "Warwick", "Cranston", "Pawtucket", "East Providence", "Woonsocket", "Coventry", "Cumberland", "North Providence", "Newport"),
+    "SC": ("Charleston", "Columbia", "North Charleston", "Mount Pleasant", "Rock Hill", "Greenville", "Summerville", "Goose Creek", "Sumter", "Spartanburg", "Myrtle Beach"),
+    "SD": ("Sioux Falls", "Rapid City", "Aberdeen", "Brookings", "Watertown", "Mitchell", "Yankton", "Huron", "Pierre", "Spearfish"),
+    "TN": ("Nashville", "Memphis", "Knoxville", "Chattanooga", "Clarksville", "Murfreesboro", "Franklin", "Johnson City", "Jackson", "Hendersonville", "Kingsport", "Brentwood"),
+    "TX": (
+        "Houston", "San Antonio", "Dallas", "Austin", "Fort Worth", "El Paso", "Arlington", "Corpus Christi",
+        "Plano", "Lubbock", "Laredo", "Irving", "Garland", "Frisco", "McKinney", "Grand Prairie", "Amarillo",
+        "Brownsville", "Killeen", "Denton", "Mesquite", "McAllen", "Midland", "Waco", "Carrollton", "Round Rock",
+        "Abilene", "Pearland", "Richardson", "Odessa", "Sugar Land", "Beaumont", "College Station", "Lewisville",
+        "League City", "Tyler", "Wichita Falls", "Allen", "San Angelo", "Edinburg", "Conroe", "Bryan",
+        "New Braunfels", "Mission", "Longview", "Pharr", "Flower Mound", "Georgetown", "Cedar Park", "Pflugerville",
+        "Leander", "San Marcos", "Kyle", "Temple", "Katy", "The Woodlands", "Spring", "Humble", "Baytown",
+        "Pasadena", "Missouri City", "Galveston", "Texas City", "Victoria", "Port Arthur", "Harlingen",
+    ),
+    "UT": ("Salt Lake City", "West Valley City", "West Jordan", "Provo", "St. George", "Orem", "Sandy", "Ogden", "Lehi", "Layton", "South Jordan", "Logan"),
+    "VT": ("Burlington", "South Burlington", "Rutland", "Essex Junction", "Barre", "Montpelier", "Winooski", "St. Albans", "Newport", "Vergennes"),
+    "VA": ("Virginia Beach", "Chesapeake", "Norfolk", "Arlington", "Richmond", "Newport News", "Alexandria", "Hampton", "Roanoke", "Portsmouth", "Suffolk", "Lynchburg", "Fairfax", "Charlottesville"),
+    "WA": ("Seattle", "Spokane", "Tacoma", "Vancouver", "Bellevue", "Kent", "Everett", "Renton", "Spokane Valley", "Federal Way", "Yakima", "Kirkland", "Redmond", "Olympia"),
+    "WV": ("Charleston", "Huntington", "Morgantown", "Parkersburg", "Wheeling", "Weirton", "Fairmont", "Martinsburg", "Beckley", "Clarksburg"),
+    "WI": ("Milwaukee", "Madison", "Green Bay", "Kenosha", "Racine", "Appleton", "Waukesha", "Eau Claire", "Oshkosh", "Janesville", "West Allis", "La Crosse"),
+    "WY": ("Cheyenne", "Casper", "Gillette", "Laramie", "Rock Springs", "Sheridan", "Green River", "Evanston", "Riverton", "Jackson"),
+}
+
+# Full state names, accepted in place of the two-letter code after a city name
+STATE_NAMES = {
+    "AL": "Alabama",
+    "AK": "Alaska",
+    "AZ": "Arizona",
+    "AR": "Arkansas",
+    "CA": "California",
+    "CO": "Colorado",
+    "CT": "Connecticut",
+    "DE": "Delaware",
+    "DC": "District of Columbia",
+    "FL": "Florida",
+    "GA": "Georgia",
+    "HI": "Hawaii",
+    "ID": "Idaho",
+    "IL": "Illinois",
+    "IN": "Indiana",
+    "IA": "Iowa",
+    "KS": "Kansas",
+    "KY": "Kentucky",
+    "LA": "Louisiana",
+    "ME": "Maine",
+    "MD": "Maryland",
+    "MA": "Massachusetts",
+    "MI": "Michigan",
+    "MN": "Minnesota",
+    "MS": "Mississippi",
+    "MO": "Missouri",
+    "MT": "Montana",
+    "NE": "Nebraska",
+    "NV": "Nevada",
+    "NH": "New Hampshire",
+    "NJ": "New Jersey",
+    "NM": "New Mexico",
+    "NY": "New York",
+    "NC": "North Carolina",
+    "ND": "North Dakota",
+    "OH": "Ohio",
+    "OK": "Oklahoma",
+    "OR": "Oregon",
+    "PA": "Pennsylvania",
+    "RI": "Rhode Island",
+    "SC": "South Carolina",
+    "SD": "South Dakota",
+    "TN": "Tennessee",
+    "TX": "Texas",
+    "UT": "Utah",
+    "VT": "Vermont",
+    "VA": "Virginia",
+    "WA": "Washington",
+    "WV": "West Virginia",
+    "WI": "Wisconsin",
+    "WY": "Wyoming",
+}
+
+@lru_cache(maxsize=None)
+def _city_pattern(state: str) -> Optional["re.Pattern[str]"]:
+    """Compile one alternation of a state's city names in address position,
+    i.e. followed by the state code, the state name or a ZIP code
+
+    Names are tried longest first so "North Little Rock" wins over "Little Rock"
+    (case-sensitive: "Mobile" is a city, "mobile" is not). Requiring the address
+    context keeps city names that are also common words or first names, such as
+    "Mission" or "Allen", from matching in running text.
+    """
+    cities = CITIES_BY_STATE.get(state)
+    if not cities:
+        return None
+    names = sorted(cities, key=len, reverse=True)
+    state_re = re.escape(state)
+    if state in STATE_NAMES:
+        state_re += '|' + re.escape(STATE_NAMES[state])
+    return re.compile(
+        r'\b(' + '|'.join(re.escape(name) for name in names) + r')'
+        r',?\s+(?:(?:' + state_re + r')\b|\d{5}\b)'
+    )
+
+def find_city(state: Optional[str], text: str) -> Optional[str]:
+    """Return the known city of state named most often in an address in text, or None"""
+    pattern = _city_pattern(state.upper()) if state else None
+    if pattern is None:
+        return None
+    counts = Counter(pattern.findall(text))
+    return counts.most_common(1)[0][0] if counts else None
@@ -1,114 +1,483 @@
-from fastapi import FastAPI, BackgroundTasks, HTTPException
-from fastapi.responses import JSONResponse
-from pydantic import BaseModel, Field
-from typing import List, Dict, Optional, Any, Union
+from fastapi import FastAPI, HTTPException, Query
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import BaseModel, ConfigDict, Field, StringConstraints, TypeAdapter, ValidationError, field_validator
+from typing import Annotated, AsyncIterator, List, Dict, Optional, Any, Set, Union
+import asyncio
+import contextlib
+import functools
+import hashlib
+import json
+import re
+import threading
 import uuid
 import logging
-from datetime import datetime
 import time
 
+import orjson
+from celery import Celery
+from celery.signals import worker_process_init, worker_process_shutdown
+import redis.asyncio as aioredis
+
 # Import our custom modules
 from research import ResearchEngine
-from models import ResearchJob, ResearchRequest, ResearchResults, Subcontractor
+from models import JobRecord, ResearchJob, ResearchRequest, ResearchResults, Subcontractor
+from utils import get_env_var, ns_to_iso
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+# Configure logging, unless a host process (e.g. uvicorn, celery) already did
+if not logging.getLogger().handlers:
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
 logger = logging.getLogger(__name__)
 
+class ORJSONResponse(JSONResponse):
+    """JSON response serialized with orjson instead of the stdlib encoder"""
+    
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content)
+
 app = FastAPI(
     title="Subcontractor Research API",
     description="API for discovering and ranking subcontractors based on criteria",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse
 )
 
-# In-memory storage for jobs (in production, use a database)
-jobs_store: Dict[str, Any] = {}
+# Celery app backed by Redis; research jobs run on a dedicated worker pool
+# started with: celery -A main worker --concurrency=8 -Q research
+REDIS_URL = get_env_var("REDIS_URL", "redis://localhost:6379/0")
+celery_app = Celery("research", broker=REDIS_URL, backend=REDIS_URL)
+celery_app.conf.task_default_queue = "research"
+
+# Optionally route jobs to per-state/per-trade queues (e.g. research.TX.electrical)
+# so workers subscribed to a subset keep their process-local caches warm
+PARTITION_QUEUES = get_env_var("PARTITION_QUEUES", "0") == "1"
+
+def research_queue(state: str, trade: str) -> str:
+    """Celery queue a job should be routed to"""
+    if not PARTITION_QUEUES:
+        return celery_app.conf.task_default_queue
+    trade_slug = re.sub(r"[^a-z0-9]+", "-", trade.lower()).strip("-")
+    return f"research.{state.upper()}.{trade_slug}"
+
+# Shared job store: one Redis hash per job, visible to every API and worker process
+JOB_TTL_SECONDS = 86400
+redis_client = aioredis.Redis(
+    connection_pool=aioredis.ConnectionPool.from_url(REDIS_URL, max_connections=50, decode_responses=True)
+)
+
+TERMINAL_STATUSES = {"SUCCEEDED", "FAILED"}
+
+# How long completed research results are reused for identical requests
+RESEARCH_CACHE_TTL_SECONDS = 86400
+
+# Upper bound for long-poll requests, kept below typical proxy idle timeouts
+MAX_LONG_POLL_SECONDS = 60
+
+# Status streams end after this long (with the current status as the last event); a
+# comment line is sent whenever nothing else was for KEEPALIVE seconds
+MAX_STREAM_SECONDS = 600
+STREAM_KEEPALIVE_SECONDS = 15
+
+def job_key(job_id: str) -> str:
+    """Redis key holding the hash for a job"""
+    return f"job:{job_id}"
+
+def job_channel(job_id: str) -> str:
+    """Redis pubsub channel carrying a job's status transitions"""
+    return f"job-events:{job_id}"
+
+JOB_CHANNEL_PATTERN = "job-events:*"
+
+class JobEventHub:
+    """Fans job events out to waiting requests from one pubsub connection per process
+    
+    Streams and long-polls register a queue per job instead of each holding a
+    pubsub connection from the shared pool. A None item means the listener
+    reconnected and events may have been missed, so the job should be re-read.
+    """
+    
+    def __init__(self):
+        self._queues: Dict[str, Set[asyncio.Queue]] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._ready: Optional[asyncio.Event] = None
+    
+    async def _listen(self):
+        """Pattern-subscribe to every job channel and dispatch messages, reconnecting on errors"""
+        while True:
+            try:
+                async with redis_client.pubsub() as pubsub:
+                    await pubsub.psubscribe(JOB_CHANNEL_PATTERN)
+                    async for message in pubsub.listen():
+                        if message["type"] == "psubscribe":
+                            self._ready.set()
+                            # Anything published while (re)connecting was missed
+                            for queues in self._queues.values():
+                                for queue in queues:
+                                    queue.put_nowait(None)
+                        elif message["type"] == "pmessage":
+                            for queue in self._queues.get(message["channel"], ()):
+                                queue.put_nowait(message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("Job event listener disconnected: %s", e)
+                self._ready.clear()
+                await asyncio.sleep(1)
+    
+    async def _ensure_listening(self):
+        """Start the listener on the running loop, if it isn't already, and wait until it is subscribed"""
+        loop = asyncio.get_running_loop()
+        if self._task is None or self._task.done() or self._task.get_loop() is not loop:
+            self._queues = {}
+            self._ready = asyncio.Event()
+            self._task = loop.create_task(self._listen())
+        await self._ready.wait()
+    
+    @contextlib.asynccontextmanager
+    async def subscribe(self, job_id: str) -> AsyncIterator[asyncio.Queue]:
+        """Yield a queue receiving the job's event payloads while the context is open"""
+        await self._ensure_listening()
+        channel = job_channel(job_id)
+        queue: asyncio.Queue = asyncio.Queue()
+        self._queues.setdefault(channel, set()).add(queue)
+        try:
+            yield queue
+        finally:
+            queues = self._queues.get(channel)
+            if queues is not None:
+                queues.discard(queue)
+                if not queues:
+                    del self._queues[channel]
+
+job_events = JobEventHub()
+
+# Cap on research pipelines running at once in a worker process; with a
+# thread pool (celery worker --pool threads) further tasks wait for a slot.
+# Prefork workers run one task per process, so there it never limits anything.
+JOB_SEM = asyncio.Semaphore(int(get_env_var("MAX_CONCURRENT_JOBS", "8")))
+
+# Each worker process drives its jobs on one long-lived event loop so that
+# loop-bound clients (e.g. the Redis connection pool) are reused across tasks
+_worker_loop: Optional[asyncio.AbstractEventLoop] = None
+_worker_loop_lock = threading.Lock()
+
+def get_worker_loop() -> asyncio.AbstractEventLoop:
+    """Return the worker's event loop, starting it on first use"""
+    global _worker_loop
+    with _worker_loop_lock:
+        if _worker_loop is None:
+            _worker_loop = asyncio.new_event_loop()
+            threading.Thread(target=_worker_loop.run_forever, name="research-loop", daemon=True).start()
+    return _worker_loop
 
 class JobRequest(BaseModel):
-    trade: str = Field(..., description="Trade type to search (e.g. electrical, plumbing)")
+    # Constraints reject malformed jobs with a 422 before anything is enqueued
+    model_config = ConfigDict(str_strip_whitespace=True)
+    
+    trade: Annotated[str, StringConstraints(min_length=2, max_length=40)] = Field(..., description="Trade type to search (e.g. electrical, plumbing)")
     city: str = Field(..., description="City of the project")
-    state: str = Field(..., description="U.S. State (2-letter code)")
-    min_bond: int = Field(..., description="Minimum bonding capacity required")
+    state: Annotated[str, StringConstraints(pattern=r"^[A-Z]{2}$")] = Field(..., description="U.S. State (2-letter code)")
+    min_bond: int = Field(..., ge=0, le=10**9, description="Minimum bonding capacity required")
     keywords: List[str] = Field(default=[], description="Optional context keywords")
+    
+    @field_validator("state", mode="before")
+    @classmethod
+    def uppercase_state(cls, value: Any) -> Any:
+        """Accept state codes in any case (e.g. "tx")"""
+        return value.strip().upper() if isinstance(value, str) else value
+
+# Bulk-serializes validated engine output in a single pydantic-core pass
+SUBCONTRACTOR_LIST = TypeAdapter(List[Subcontractor])
+
+def validate_profiles(job_id: str, profiles: List[Dict[str, Any]]) -> List[Subcontractor]:
+    """Validate engine profiles one by one, logging and dropping invalid ones so they don't fail the job"""
+    subcontractors = []
+    for profile in profiles:
+        try:
+            subcontractors.append(Subcontractor.model_validate(profile))
+        except ValidationError as e:
+            logger.warning("Dropping invalid profile %s in job %s: %s", profile.get("website"), job_id, e)
+    return subcontractors
 
 class JobResponse(BaseModel):
     job_id: str
     status: str
 
 @app.post("/research-jobs", response_model=JobResponse)
-async def create_research_job(request: JobRequest, background_tasks: BackgroundTasks):
+async def create_research_job(request: JobRequest):
     """Create a new subcontractor research job"""
-    job_id = str(uuid.uuid4())
+    # Compact 32-char hex id keeps Redis keys short
+    job_id = uuid.uuid4().hex
+    
+    # The request travels to the worker as the task payload; the job hash only tracks status
+    payload = request.model_dump(mode="python")
     
     # Initialize job in our store
-    jobs_store[job_id] = {
-        "status": "QUEUED",
-        "request": request.dict(),
-        "created_at": datetime.now().isoformat(),
-        "results": None
-    }
-    
-    # Add the research task to run in the background
-    background_tasks.add_task(
-        process_research_job, 
-        job_id, 
-        request.trade, 
-        request.city, 
-        request.state, 
-        request.min_bond, 
-        request.keywords
+    key = job_key(job_id)
+    async with redis_client.pipeline() as pipe:
+        record = JobRecord(status="QUEUED", created_at_ns=time.time_ns())
+        pipe.hset(key, mapping=record.to_redis())
+        pipe.expire(key, JOB_TTL_SECONDS)
+        await pipe.execute()
+    
+    # Hand the research off to the worker pool; publishing is a blocking broker
+    # round-trip, so it runs in a thread to keep the event loop serving other requests
+    await asyncio.to_thread(
+        run_research.apply_async, args=[job_id, payload], queue=research_queue(request.state, request.trade)
     )
     
     return JobResponse(job_id=job_id, status="QUEUED")
 
+@app.get("/research-jobs")
+async def list_research_jobs(
+    cursor: int = Query(0, ge=0, description="Cursor returned by the previous page (0 to start)"),
+    count: int = Query(100, ge=1, le=1000, description="Approximate number of jobs per page")
+):
+    """List research jobs page by page using Redis SCAN"""
+    next_cursor, keys = await redis_client.scan(cursor, match="job:*", count=count)
+    
+    # Fetch only the summary fields for the page in a single round-trip
+    async with redis_client.pipeline(transaction=False) as pipe:
+        for key in keys:
+            pipe.hmget(key, "status", "created_at_ns")
+        summaries = await pipe.execute()
+    
+    # created_at_ns is missing for jobs that expired while queued and were written again by the worker
+    items = [
+        {"job_id": key.split(":", 1)[1], "status": status, "created_at": ns_to_iso(int(created_at_ns)) if created_at_ns else None}
+        for key, (status, created_at_ns) in zip(keys, summaries)
+        if status is not None  # expired between SCAN and HMGET
+    ]
+    
+    return {"next_cursor": next_cursor, "items": items}
+
+@functools.lru_cache(maxsize=1)
+def get_engine() -> ResearchEngine:
+    """Return the process-wide research engine, constructing it on first use"""
+    return ResearchEngine(simulate_licenses=get_env_var("SIMULATE_LICENSES", "1") == "1")
+
+@worker_process_init.connect
+def init_worker_process(**kwargs):
+    """Build the research engine once per worker process rather than per job"""
+    get_engine()
+
+@worker_process_shutdown.connect
+def shutdown_worker_process(**kwargs):
+    """Close the engine's pooled HTTP connections when the worker process exits"""
+    if _worker_loop is not None:
+        asyncio.run_coroutine_threadsafe(get_engine().aclose(), _worker_loop).result(timeout=10)
+
+@celery_app.task(name="run_research")
+def run_research(job_id: str, request: Dict[str, Any]):
+    """Celery entry point for a research job"""
+    future = asyncio.run_coroutine_threadsafe(
+        process_research_job(
+            job_id,
+            request["trade"],
+            request["city"],
+            request["state"],
+            request["min_bond"],
+            request["keywords"]
+        ),
+        get_worker_loop()
+    )
+    future.result()
+
+def research_cache_key(trade: str, city: str, state: str, min_bond: int, keywords: List[str]) -> str:
+    """Redis key for cached results, ignoring case and keyword order"""
+    canonical = orjson.dumps({
+        "trade": trade.lower(),
+        "city": city.lower(),
+        "state": state.upper(),
+        "min_bond": min_bond,
+        "keywords": sorted(keyword.lower() for keyword in keywords),
+    })
+    return f"research-cache:{hashlib.blake2b(canonical, digest_size=16).hexdigest()}"
+
+async def update_job_status(job_id: str, fields: Dict[str, Any]):
+    """Write job fields and publish the status transition in one MULTI/EXEC round-trip"""
+    # Readers never observe the new status without its accompanying fields; the TTL is
+    # renewed with every write, since a job that waited in the queue past its expiry
+    # would otherwise be recreated by HSET as a hash that never expires
+    key = job_key(job_id)
+    async with redis_client.pipeline(transaction=True) as pipe:
+        pipe.hset(key, mapping=fields)
+        pipe.expire(key, JOB_TTL_SECONDS)
+        pipe.publish(job_channel(job_id), json.dumps({"status": fields["status"]}))
+        await pipe.execute()
+
 async def process_research_job(job_id: str, trade: str, city: str, state: str, min_bond: int, keywords: List[str]):
     """Process a research job in the background"""
-    try:
-        # Update job status
-        jobs_store[job_id]["status"] = "PROCESSING"
-        
-        # Initialize the research engine
-        engine = ResearchEngine()
-        
-        # Run the research pipeline
-        logger.info(f"Starting research for job {job_id}")
-        results = await engine.run_research(trade, city, state, min_bond, keywords)
+    # Jobs beyond the concurrency cap wait here and stay QUEUED until a slot frees
+    async with JOB_SEM:
+        try:
+            # Update job status
+            await update_job_status(job_id, {"status": "PROCESSING"})
+            
+            # Serve identical recent requests from the results cache
+            cache_key = research_cache_key(trade, city, state, min_bond, keywords)
+            results_json = await redis_client.get(cache_key)
+            
+            if results_json is None:
+                # Reuse the process-wide research engine
+                engine = get_engine()
+                
+                # Run the research pipeline (transient network failures are retried per page by the engine)
+                logger.info("Starting research for job %s", job_id)
+                results = await engine.run_research(trade, city, state, min_bond, keywords)
+                
+                # Validate and serialize to JSON, then cache for later identical requests; empty
+                # results are not cached, since they may only reflect a network outage
+                subcontractors = validate_profiles(job_id, results)
+                results_json = SUBCONTRACTOR_LIST.dump_json(subcontractors)
+                if subcontractors:
+                    await redis_client.set(cache_key, results_json, ex=RESEARCH_CACHE_TTL_SECONDS)
+            else:
+                logger.info("Serving job %s from the research cache", job_id)
+            
+            # Update job with results
+            await update_job_status(job_id, {
+                "status": "SUCCEEDED",
+                "results": results_json,
+                "completed_at_ns": time.time_ns(),
+            })
+            
+            logger.info("Research job %s completed successfully", job_id)
+        except Exception as e:
+            # Handle errors
+            logger.error("Error processing job %s: %s", job_id, e)
+            await update_job_status(job_id, {"status": "FAILED", "error": str(e)})
+
+async def wait_for_terminal_status(job_id: str, timeout: float):
+    """Block until the job publishes a terminal status or the timeout expires"""
+    # Events arrive through the process-wide listener, so waiting holds no pool connection
+    async with job_events.subscribe(job_id) as events:
+        # The job may have finished before the subscription took effect
+        if await redis_client.hget(job_key(job_id), "status") in TERMINAL_STATUSES:
+            return
         
-        # Update job with results
-        jobs_store[job_id]["status"] = "SUCCEEDED"
-        jobs_store[job_id]["results"] = results
-        jobs_store[job_id]["completed_at"] = datetime.now().isoformat()
+        async def next_terminal_event():
+            while True:
+                data = await events.get()
+                if data is None:
+                    # The listener reconnected; a terminal event may have been missed
+                    if await redis_client.hget(job_key(job_id), "status") in TERMINAL_STATUSES:
+                        return
+                elif json.loads(data)["status"] in TERMINAL_STATUSES:
+                    return
         
-        logger.info(f"Research job {job_id} completed successfully")
-    except Exception as e:
-        # Handle errors
-        logger.error(f"Error processing job {job_id}: {str(e)}")
-        jobs_store[job_id]["status"] = "FAILED"
-        jobs_store[job_id]["error"] = str(e)
-
-@app.get("/research-jobs/{job_id}")
-async def get_research_results(job_id: str):
-    """Get the results of a research job"""
-    if job_id not in jobs_store:
+        try:
+            await asyncio.wait_for(next_terminal_event(), timeout=timeout)
+        except asyncio.TimeoutError:
+            pass
+
+SUCCEEDED_EXAMPLE = {
+    "status": "SUCCEEDED",
+    "created_at": "2025-05-05T12:30:02.113408+00:00",
+    "completed_at": "2025-05-05T12:34:56.902113+00:00",
+    "results": [{
+        "name": "XYZ Mechanical Contractors",
+        "website": "https://xyzmech.com",
+        "email": "info@xyzmech.com",
+        "phone_number": "(512) 555-1234",
+        "city": "Austin",
+        "state": "TX",
+        "lic_active": True,
+        "lic_number": "TX12345678",
+        "bond_amount": 6000000,
+        "tx_projects_past_5yrs": 4,
+        "score": 92,
+        "evidence_url": "https://xyzmech.com/about",
+        "evidence_text": "Bonded up to $6 million.",
+        "last_checked": "2025-05-05T12:34:56"
+    }]
+}
+
+@app.get(
+    "/research-jobs/{job_id}",
+    response_model=None,
+    responses={200: {"content": {"application/json": {"example": SUCCEEDED_EXAMPLE}}}}
+)
+async def get_research_results(
+    job_id: str,
+    wait: int = Query(0, ge=0, description=f"Seconds to wait for the job to finish (max {MAX_LONG_POLL_SECONDS})")
+):
+    """Get the results of a research job, optionally long-polling until it finishes"""
+    key = job_key(job_id)
+    
+    # Read only the status first; payload fields are fetched per branch below
+    status = await redis_client.hget(key, "status")
+    if status is None:
         raise HTTPException(status_code=404, detail="Job not found")
     
-    job = jobs_store[job_id]
+    if wait > 0 and status not in TERMINAL_STATUSES:
+        await wait_for_terminal_status(job_id, min(wait, MAX_LONG_POLL_SECONDS))
+        status = await redis_client.hget(key, "status")
     
     # Return different response based on job status
-    if job["status"] == "QUEUED":
+    if status == "QUEUED":
         return {"status": "QUEUED", "message": "Job is queued for processing"}
-    elif job["status"] == "PROCESSING":
+    elif status == "PROCESSING":
         return {"status": "PROCESSING", "message": "Job is currently being processed"}
-    elif job["status"] == "FAILED":
-        return {"status": "FAILED", "message": f"Job processing failed: {job.get('error', 'Unknown error')}"}
-    elif job["status"] == "SUCCEEDED":
-        return {
+    elif status == "FAILED":
+        error = await redis_client.hget(key, "error")
+        return {"status": "FAILED", "message": f"Job processing failed: {error or 'Unknown error'}"}
+    elif status == "SUCCEEDED":
+        results, created_at_ns, completed_at_ns = await redis_client.hmget(key, "results", "created_at_ns", "completed_at_ns")
+        
+        # Results were validated by the worker before storage, so the stored
+        # JSON is embedded as-is instead of being decoded and re-encoded
+        return ORJSONResponse({
             "status": "SUCCEEDED",
-            "results": job["results"]
-        }
+            "created_at": ns_to_iso(int(created_at_ns)) if created_at_ns else None,
+            "completed_at": ns_to_iso(int(completed_at_ns)) if completed_at_ns else None,
+            "results": orjson.Fragment(results)
+        })
+    
+    # The job expired while we were waiting on it
+    raise HTTPException(status_code=404, detail="Job not found")
+
+@app.get("/research-jobs/{job_id}/stream")
+async def stream_research_job(job_id: str):
+    """Stream status transitions of a research job as Server-Sent Events (for at most MAX_STREAM_SECONDS)"""
+    if not await redis_client.exists(job_key(job_id)):
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    async def event_stream():
+        async with job_events.subscribe(job_id) as events:
+            # Read the status after subscribing so no transition is missed in between
+            status = await redis_client.hget(job_key(job_id), "status")
+            yield f"data: {json.dumps({'status': status})}\n\n"
+            if status in TERMINAL_STATUSES:
+                return
+            
+            loop = asyncio.get_running_loop()
+            deadline = loop.time() + MAX_STREAM_SECONDS
+            while (remaining := deadline - loop.time()) > 0:
+                try:
+                    data = await asyncio.wait_for(events.get(), timeout=min(STREAM_KEEPALIVE_SECONDS, remaining))
+                except asyncio.TimeoutError:
+                    # Keeps proxies from closing an idle stream
+                    yield ": keepalive\n\n"
+                    continue
+                if data is None:
+                    # The listener reconnected; report the stored status in case a transition was missed
+                    data = json.dumps({"status": await redis_client.hget(job_key(job_id), "status")})
+                yield f"data: {data}\n\n"
+                if json.loads(data)["status"] in TERMINAL_STATUSES:
+                    return
+            
+            # Out of time (e.g. the worker died mid-job): close with the current status
+            status = await redis_client.hget(job_key(job_id), "status")
+            yield f"data: {json.dumps({'status': status})}\n\n"
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache"}
+    )
 
 @app.get("/")
 async def root():
@@ -117,4 +486,14 @@ async def root():
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
+    # Auto-reload is for development only (DEV=1); production runs several
+    # workers on the uvloop event loop and httptools HTTP parser
+    uvicorn.run(
+        "main:app",
+        host="0.0.0.0",
+        port=8000,
+        reload=get_env_var("DEV") == "1",
+        loop="uvloop",
+        http="httptools",
+        workers=int(get_env_var("WEB_CONCURRENCY", "4"))
+    )
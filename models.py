@@ -1,9 +1,13 @@
-from pydantic import BaseModel, Field, HttpUrl
+from pydantic import BaseModel, ConfigDict, Field, HttpUrl
 from typing import List, Dict, Optional, Any
+from dataclasses import dataclass
 from datetime import datetime
 
 class Subcontractor(BaseModel):
     """Model representing a researched subcontractor"""
+    # Output-only record: freezing skips per-field assignment validation
+    model_config = ConfigDict(frozen=True)
+    
     name: str
     website: str
     email: Optional[str] = None
@@ -21,6 +25,8 @@ class Subcontractor(BaseModel):
 
 class ResearchRequest(BaseModel):
     """Model for research job requests"""
+    model_config = ConfigDict(str_strip_whitespace=True)
+    
     trade: str
     city: str
     state: str
@@ -40,3 +46,16 @@ class ResearchJob(BaseModel):
     completed_at: Optional[datetime] = None
     results: Optional[ResearchResults] = None
     error: Optional[str] = None
+
+@dataclass(slots=True)
+class JobRecord:
+    """Compact storage record for a newly created research job, persisted as a Redis hash"""
+    status: str
+    created_at_ns: int  # epoch nanoseconds; formatted to ISO only when rendered
+
+    def to_redis(self) -> Dict[str, Any]:
+        """Flatten into a hash mapping"""
+        return {
+            "status": self.status,
+            "created_at_ns": self.created_at_ns,
+        }
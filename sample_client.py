@@ -1,10 +1,37 @@
-import requests
-import json
-import time
+import aiohttp
+import asyncio
+import async_timeout
+import ijson
+import orjson
+import random
 import argparse
-from typing import Dict, Any
+import contextlib
+import itertools
+import os
+import sys
+from typing import Dict, Any, List, Optional, Tuple
 
-def submit_research_job(
+# Timeouts applied to every API call; one session (and its keep-alive pool)
+# is shared by all jobs' submits and status polls
+REQUEST_TIMEOUT = aiohttp.ClientTimeout(total=30, connect=5)
+
+# Jobs submitted and awaited at once when running several; each job uses at
+# most one connection at a time, so this also sizes the connection pool
+MAX_CONCURRENT_JOBS = 10
+
+# Where print_results saves the full job (one file per job when running several),
+# and how much of a streamed response is read at a time
+RESULTS_FILE = "research_results.json"
+JOB_RESULTS_FILE = "research_results_{job_id}.json"
+# NO_SAVE=1 prints results to the console only
+SAVE_RESULTS = os.environ.get("NO_SAVE") != "1"
+STREAM_CHUNK_SIZE = 64 * 1024
+
+# Job statuses after which the server makes no further changes
+TERMINAL = frozenset({"SUCCEEDED", "FAILED"})
+
+async def submit_research_job(
+    session: aiohttp.ClientSession,
     base_url: str,
     trade: str,
     city: str,
@@ -23,122 +50,300 @@ def submit_research_job(
         "keywords": keywords
     }
     
-    response = requests.post(url, json=payload)
-    
-    if response.status_code == 200:
-        result = response.json()
-        return result.get("job_id")
-    else:
-        print(f"Error submitting job: {response.status_code}")
-        print(response.text)
-        return None
+    async with session.post(url, json=payload) as response:
+        if response.status == 200:
+            result = await response.json(loads=orjson.loads)
+            return result.get("job_id")
+        else:
+            print(f"Error submitting job: {response.status}")
+            print(await response.text())
+            return None
 
-def check_job_status(base_url: str, job_id: str) -> Dict[str, Any]:
-    """Check the status of a research job"""
+async def check_job_status(session: aiohttp.ClientSession, base_url: str, job_id: str) -> Tuple[Optional[Dict[str, Any]], Optional[float]]:
+    """Check the status of a research job
+    
+    Returns the job and, if the server is rate limiting (429), the number of
+    seconds it asked to wait instead.
+    """
     url = f"{base_url}/research-jobs/{job_id}"
     
-    response = requests.get(url)
+    async with session.get(url) as response:
+        if response.status == 200:
+            return await response.json(loads=orjson.loads), None
+        elif response.status == 429:
+            # Retry-After in seconds; HTTP-date values (or none at all) fall back to 5s
+            retry_after = response.headers.get("Retry-After", "")
+            return None, float(retry_after) if retry_after.isdigit() else 5.0
+        else:
+            print(f"Error checking job status: {response.status}")
+            print(await response.text())
+            return None, None
+
+async def wait_for_job_completion(
+    session: aiohttp.ClientSession,
+    base_url: str,
+    job_id: str,
+    max_wait_time: int = 300,
+    check_interval: float = 2,
+    max_interval: float = 30,
+    backoff_rate: float = 1.5
+) -> Dict[str, Any]:
+    """Wait for job to complete with timeout
+    
+    Polls back off exponentially (with jitter) while the status is unchanged,
+    and start again from check_interval whenever it changes.
+    """
+    last_status = None
+    unchanged_polls = 0
     
-    if response.status_code == 200:
-        return response.json()
-    else:
-        print(f"Error checking job status: {response.status_code}")
-        print(response.text)
+    # One deadline for the whole wait, enforced by the event loop even mid-sleep or mid-request
+    try:
+        async with async_timeout.timeout(max_wait_time):
+            while True:
+                result, retry_after = await check_job_status(session, base_url, job_id)
+                
+                if retry_after is not None:
+                    # Rate limited: wait as long as the server asked
+                    await asyncio.sleep(retry_after)
+                    continue
+                    
+                if not result:
+                    print("Failed to get job status")
+                    return None
+                    
+                status = result.get("status")
+                print(f"[{job_id}] Current status: {status}")
+                
+                if status == last_status:
+                    unchanged_polls += 1
+                else:
+                    last_status = status
+                    unchanged_polls = 0
+                
+                if status in TERMINAL:
+                    if status == "SUCCEEDED":
+                        return result
+                    print(f"Job failed: {result.get('message', 'Unknown error')}")
+                    return None
+                    
+                delay = min(max_interval, check_interval * backoff_rate ** unchanged_polls)
+                await asyncio.sleep(random.uniform(delay / 2, delay))
+    except asyncio.TimeoutError:
+        print(f"Timeout after waiting {max_wait_time} seconds")
         return None
 
-def wait_for_job_completion(base_url: str, job_id: str, max_wait_time: int = 300, check_interval: int = 5) -> Dict[str, Any]:
-    """Wait for job to complete with timeout"""
-    start_time = time.time()
+async def wait_for_job_events(session: aiohttp.ClientSession, base_url: str, job_id: str, max_wait_time: int = 300) -> Dict[str, Any]:
+    """Wait for job to complete by following its status event stream
     
-    while time.time() - start_time < max_wait_time:
-        result = check_job_status(base_url, job_id)
+    One long-lived request replaces repeated polls; servers without the
+    stream endpoint (404) are polled instead.
+    """
+    url = f"{base_url}/research-jobs/{job_id}/stream"
+    # The stream stays open until the job finishes, so only the overall wait bounds it
+    timeout = aiohttp.ClientTimeout(total=max_wait_time, connect=5)
+    event = {}
+    
+    try:
+        async with session.get(url, timeout=timeout, headers={"Accept": "text/event-stream"}) as response:
+            if response.status == 404:
+                return await wait_for_job_completion(session, base_url, job_id, max_wait_time)
+            if response.status != 200:
+                print(f"Error streaming job status: {response.status}")
+                print(await response.text())
+                return None
+                
+            # Each event is a "data: {...}" line holding the new status
+            async for line in response.content:
+                if not line.startswith(b"data:"):
+                    continue
+                event = orjson.loads(line[5:])
+                print(f"[{job_id}] Current status: {event.get('status')}")
+                if event.get("status") in TERMINAL:
+                    break
+    except asyncio.TimeoutError:
+        print(f"Timeout after waiting {max_wait_time} seconds")
+        return None
         
-        if not result:
-            print("Failed to get job status")
-            return None
-            
-        status = result.get("status")
-        print(f"Current status: {status}")
+    if event.get("status") == "FAILED":
+        # Events only carry the status; the error message is read from the job itself
+        result, _ = await check_job_status(session, base_url, job_id)
+        print(f"Job failed: {(result or {}).get('message', 'Unknown error')}")
+        return None
+    if event.get("status") != "SUCCEEDED":
+        print("Status stream ended before the job finished")
+        return None
         
-        if status == "SUCCEEDED":
-            return result
-        elif status == "FAILED":
-            print(f"Job failed: {result.get('message', 'Unknown error')}")
+    # Results are not part of the event; the caller streams them with stream_job_results
+    return event
+
+async def stream_job_results(
+    session: aiohttp.ClientSession,
+    base_url: str,
+    job_id: str,
+    top_n: int = 5,
+    results_file: str = RESULTS_FILE
+) -> Optional[Tuple[List[Dict[str, Any]], int]]:
+    """Stream a finished job's results without holding them all in memory
+    
+    The response body is written to results_file as it arrives (unless NO_SAVE
+    is set) while ijson picks the results out of the same chunks. Returns the first top_n results
+    and the total count.
+    """
+    url = f"{base_url}/research-jobs/{job_id}"
+    top, total = [], 0
+    parsed = ijson.sendable_list()
+    parser = ijson.items_coro(parsed, "results.item", use_float=True)
+    
+    def collect():
+        nonlocal total
+        for sub in parsed:
+            if len(top) < top_n:
+                top.append(sub)
+            total += 1
+        del parsed[:]
+    
+    async with session.get(url) as response:
+        if response.status != 200:
+            print(f"Error fetching job results: {response.status}")
+            print(await response.text())
             return None
             
-        time.sleep(check_interval)
+        with open(results_file, "wb") if SAVE_RESULTS else contextlib.nullcontext() as f:
+            async for chunk in response.content.iter_chunked(STREAM_CHUNK_SIZE):
+                if f:
+                    f.write(chunk)
+                parser.send(chunk)
+                collect()
+    parser.close()
+    collect()
     
-    print(f"Timeout after waiting {max_wait_time} seconds")
-    return None
+    return top, total
 
-def print_results(results: Dict[str, Any]) -> None:
+def print_matches(top_matches: List[Dict[str, Any]], total: int) -> bool:
+    """Print the match count and the top matches, returning whether there were any"""
+    # Lines are collected and written to stdout in one call
+    lines = [
+        "\n==== SUBCONTRACTOR RESEARCH RESULTS ====\n",
+        f"Total candidates found: {total}",
+    ]
+    
+    if not top_matches:
+        lines.append("No matching subcontractors found")
+        sys.stdout.write("\n".join(lines) + "\n")
+        return False
+        
+    lines.append("\nTop 5 Matches:")
+    for i, sub in enumerate(top_matches):
+        bond = sub.get('bond_amount')
+        lines.extend((
+            f"\n--- #{i+1}: {sub['name']} (Score: {sub['score']}) ---",
+            f"Website: {sub['website']}",
+            f"Location: {sub.get('city', 'Unknown')}, {sub.get('state', '')}",
+            f"License: {'Active' if sub.get('lic_active') else 'Inactive or Unknown'} {sub.get('lic_number', '')}",
+            f"Bond Amount: ${bond:,}" if bond else "Bond Amount: Unknown",
+            f"TX Projects (past 5 yrs): {sub.get('tx_projects_past_5yrs', 0)}",
+            f"Evidence: {sub.get('evidence_text', 'None')}",
+        ))
+    
+    sys.stdout.write("\n".join(lines) + "\n")
+    return True
+
+def print_results(results: Dict[str, Any], results_file: str = RESULTS_FILE) -> None:
     """Print formatted results"""
     if not results or "results" not in results:
         print("No results available")
         return
         
     subcontractors = results["results"]
-    
-    print("\n==== SUBCONTRACTOR RESEARCH RESULTS ====\n")
-    print(f"Total candidates found: {len(subcontractors)}")
-    
-    if not subcontractors:
-        print("No matching subcontractors found")
+    if not print_matches(subcontractors[:5], len(subcontractors)) or not SAVE_RESULTS:
         return
         
-    print("\nTop 5 Matches:")
-    for i, sub in enumerate(subcontractors[:5]):
-        print(f"\n--- #{i+1}: {sub['name']} (Score: {sub['score']}) ---")
-        print(f"Website: {sub['website']}")
-        print(f"Location: {sub.get('city', 'Unknown')}, {sub.get('state', '')}")
-        print(f"License: {'Active' if sub.get('lic_active') else 'Inactive or Unknown'} {sub.get('lic_number', '')}")
+    # Save full results to file (orjson encodes in C, with the same 2-space indent)
+    with open(results_file, "wb") as f:
+        f.write(orjson.dumps(results, option=orjson.OPT_INDENT_2))
+    print(f"\nFull results saved to {results_file}")
+
+async def run_job(
+    session: aiohttp.ClientSession,
+    base_url: str,
+    config: Dict[str, Any],
+    results_file: str = RESULTS_FILE
+) -> Optional[Dict[str, Any]]:
+    """Submit one research job, wait for it and print its results
+    
+    results_file may contain {job_id}, filled in once the job is submitted.
+    """
+    print(f"Submitting research job for {config['trade']} contractors in {config['city']}, {config['state']}")
+    print(f"Minimum bond: ${config['min_bond']:,}")
+    print(f"Keywords: {config['keywords']}")
+    
+    job_id = await submit_research_job(session, base_url, **config)
+    if not job_id:
+        return None
         
-        bond = sub.get('bond_amount')
-        if bond:
-            print(f"Bond Amount: ${bond:,}")
-        else:
-            print("Bond Amount: Unknown")
-            
-        print(f"TX Projects (past 5 yrs): {sub.get('tx_projects_past_5yrs', 0)}")
-        print(f"Evidence: {sub.get('evidence_text', 'None')}")
+    print(f"Job submitted successfully with ID: {job_id}")
+    results_file = results_file.format(job_id=job_id)
+    
+    print("Waiting for job completion...")
+    job = await wait_for_job_events(session, base_url, job_id)
+    if not job:
+        return None
         
-    # Save full results to file
-    with open("research_results.json", "w") as f:
-        json.dump(results, f, indent=2)
-    print("\nFull results saved to research_results.json")
+    if "results" in job:
+        # Polled status responses already carry the results
+        print_results(job, results_file)
+    else:
+        streamed = await stream_job_results(session, base_url, job_id, results_file=results_file)
+        if streamed and print_matches(*streamed) and SAVE_RESULTS:
+            print(f"\nFull results saved to {results_file}")
+    return job
+
+async def run_jobs(base_url: str, configs: List[Dict[str, Any]], max_concurrent: int = MAX_CONCURRENT_JOBS) -> List[Optional[Dict[str, Any]]]:
+    """Run several research jobs concurrently over one HTTP session
+    
+    At most max_concurrent jobs are in flight, so a long list does not flood the API.
+    """
+    semaphore = asyncio.Semaphore(max_concurrent)
+    results_file = RESULTS_FILE if len(configs) == 1 else JOB_RESULTS_FILE
+    
+    async def run_bounded(session: aiohttp.ClientSession, config: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        async with semaphore:
+            return await run_job(session, base_url, config, results_file)
+    
+    connector = aiohttp.TCPConnector(limit=max_concurrent)
+    # Request and response bodies are encoded and decoded with orjson
+    async with aiohttp.ClientSession(
+        connector=connector,
+        timeout=REQUEST_TIMEOUT,
+        json_serialize=lambda obj: orjson.dumps(obj).decode()
+    ) as session:
+        return await asyncio.gather(*(run_bounded(session, config) for config in configs))
 
 def main():
     parser = argparse.ArgumentParser(description="Subcontractor Research Client")
     parser.add_argument("--url", default="http://localhost:8000", help="API base URL")
-    parser.add_argument("--trade", default="mechanical", help="Trade type")
-    parser.add_argument("--city", default="Austin", help="City")
+    parser.add_argument("--trade", nargs="+", default=["mechanical"], help="Trade type(s)")
+    parser.add_argument("--city", nargs="+", default=["Austin"], help="City or cities")
     parser.add_argument("--state", default="TX", help="State (2-letter code)")
     parser.add_argument("--min-bond", type=int, default=5000000, help="Minimum bonding capacity")
     parser.add_argument("--keywords", nargs="+", default=["hotel", "commercial"], help="Keywords")
+    parser.add_argument("--max-concurrent", type=int, default=MAX_CONCURRENT_JOBS, help="Maximum jobs in flight at once")
     
     args = parser.parse_args()
     
-    print(f"Submitting research job for {args.trade} contractors in {args.city}, {args.state}")
-    print(f"Minimum bond: ${args.min_bond:,}")
-    print(f"Keywords: {args.keywords}")
-    
-    job_id = submit_research_job(
-        args.url,
-        args.trade,
-        args.city,
-        args.state,
-        args.min_bond,
-        args.keywords
-    )
-    
-    if job_id:
-        print(f"Job submitted successfully with ID: {job_id}")
-        
-        print("Waiting for job completion...")
-        results = wait_for_job_completion(args.url, job_id)
-        
-        if results:
-            print_results(results)
+    # One job per trade/city combination
+    configs = [
+        {
+            "trade": trade,
+            "city": city,
+            "state": args.state,
+            "min_bond": args.min_bond,
+            "keywords": args.keywords
+        }
+        for trade, city in itertools.product(args.trade, args.city)
+    ]
+    
+    asyncio.run(run_jobs(args.url, configs, args.max_concurrent))
     
 if __name__ == "__main__":
     main()
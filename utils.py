@@ -1,60 +1,99 @@
 import os
+import functools
 import logging
 import json
 import csv
-import io
 from typing import List, Dict, Any
-from datetime import datetime
+from datetime import datetime, timezone
 
+# Shared by every handler setup_logging installs
+_FORMATTER = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+# Markdown table layout for generate_markdown_table
+TABLE_HEADER = "| Rank | Company | Location | License | Bond | TX Projects | Score |\n"
+TABLE_SEPARATOR = "|------|---------|----------|---------|------|-------------|-------|\n"
+ROW_FMT = "| {rank} | {name} | {location} | {license} | {bond} | {projects} | {score} |\n"
+
+# Above this many rows, CSV export and markdown tables go through pandas
+# (imported only then) so the per-row work runs in vectorized column operations
+PANDAS_MIN_ROWS = 500
+
+# CSV export column order
+CSV_FIELDS = (
+    "name", "website", "email", "phone_number", "city", "state",
+    "lic_active", "lic_number", "bond_amount", "tx_projects_past_5yrs",
+    "score", "evidence_url", "evidence_text", "last_checked"
+)
+
+# Fields used per markdown row, with their defaults (as columns for the pandas path)
+MARKDOWN_DEFAULTS = {
+    "name": "Unknown", "city": "Unknown", "state": "", "lic_active": None, "lic_number": None,
+    "bond_amount": None, "tx_projects_past_5yrs": 0, "score": 0,
+}
+
+@functools.lru_cache(maxsize=None)
 def get_env_var(name: str, default: str = None) -> str:
-    """Get environment variable with fallback to default"""
+    """Get environment variable with fallback to default
+    
+    Values are read once per (name, default) and cached, since the environment
+    is fixed after startup; call get_env_var.cache_clear() after changing it.
+    """
     return os.environ.get(name, default)
 
+def ns_to_iso(timestamp_ns: int) -> str:
+    """Format an epoch-nanosecond timestamp as an ISO 8601 UTC string"""
+    return datetime.fromtimestamp(timestamp_ns / 1e9, tz=timezone.utc).isoformat()
+
 def setup_logging() -> logging.Logger:
     """Configure logging for the application"""
     logger = logging.getLogger("subcontractor_research")
     
+    # Already configured (repeated calls must not stack handlers)
+    if logger.handlers:
+        return logger
+    
     # Configure logging level based on environment
     log_level = get_env_var("LOG_LEVEL", "INFO")
     logger.setLevel(getattr(logging, log_level))
     
-    # Create console handler
+    # Create console handler; records stop here rather than being emitted again by the root logger
     handler = logging.StreamHandler()
-    formatter = logging.Formatter(
-        '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-    )
-    handler.setFormatter(formatter)
+    handler.setFormatter(_FORMATTER)
     logger.addHandler(handler)
+    logger.propagate = False
     
     return logger
 
 def export_results_to_csv(results: List[Dict[str, Any]], filename: str) -> str:
-    """Export research results to CSV file"""
+    """Export research results to CSV file, returning the file name ("" if there are no results)"""
     if not results:
         return ""
         
-    # Define field order
-    fields = [
-        "name", "website", "email", "phone_number", "city", "state",
-        "lic_active", "lic_number", "bond_amount", "tx_projects_past_5yrs",
-        "score", "evidence_url", "evidence_text", "last_checked"
-    ]
+    if len(results) > PANDAS_MIN_ROWS:
+        import pandas as pd
+        # Object dtype keeps values as-is (no int -> float promotion where some are missing)
+        # and the csv module's \r\n line endings match the writer path below
+        pd.DataFrame(results, columns=list(CSV_FIELDS), dtype=object).to_csv(
+            filename, index=False, lineterminator="\r\n"
+        )
+        return filename
     
-    # Create CSV in memory
-    output = io.StringIO()
-    writer = csv.DictWriter(output, fieldnames=fields)
-    writer.writeheader()
-    
-    for result in results:
-        # Only include fields that exist in our field list
-        row = {field: result.get(field, "") for field in fields}
-        writer.writerow(row)
-    
-    # Save to file
+    # Write rows straight to the file as plain lists in field order
+    # (extra keys are ignored and missing ones left blank)
     with open(filename, 'w', newline='') as file:
-        file.write(output.getvalue())
+        writer = csv.writer(file)
+        writer.writerow(CSV_FIELDS)
+        writer.writerows([result.get(field, "") for field in CSV_FIELDS] for result in results)
     
-    return output.getvalue()
+    return filename
+
+def _fmt_bond(bond_amount: Any) -> str:
+    """Format a bond amount for the markdown table ($X.XM for millions)"""
+    if not bond_amount:
+        return "Unknown"
+    if bond_amount >= 1000000:
+        return f"${bond_amount/1000000:.1f}M"
+    return f"${bond_amount:,}"
 
 def generate_markdown_table(results: List[Dict[str, Any]], limit: int = 10) -> str:
     """Generate markdown table of top results"""
@@ -64,36 +103,54 @@ def generate_markdown_table(results: List[Dict[str, Any]], limit: int = 10) -> s
     # Limit to top N results
     top_results = results[:limit]
     
-    # Build table header
-    table = "| Rank | Company | Location | License | Bond | TX Projects | Score |\n"
-    table += "|------|---------|----------|---------|------|-------------|-------|\n"
+    # Build table header; rows are collected in a list and joined once at the end
+    rows = [TABLE_HEADER, TABLE_SEPARATOR]
+    
+    if len(top_results) > PANDAS_MIN_ROWS:
+        rows.extend(_markdown_rows_pandas(top_results))
+        return "".join(rows)
     
     # Add rows
     for i, result in enumerate(top_results):
-        name = result.get("name", "Unknown")
-        location = f"{result.get('city', 'Unknown')}, {result.get('state', '')}"
-        
         # Format license status
         license_status = "Active" if result.get("lic_active") else "Inactive"
         if result.get("lic_number"):
             license_status += f" ({result.get('lic_number')})"
         
-        # Format bond amount
-        bond = "Unknown"
-        if result.get("bond_amount"):
-            bond_amount = result.get("bond_amount")
-            if bond_amount >= 1000000:
-                bond = f"${bond_amount/1000000:.1f}M"
-            else:
-                bond = f"${bond_amount:,}"
-        
-        # Format projects
-        projects = result.get("tx_projects_past_5yrs", 0)
-        
-        # Format score
-        score = result.get("score", 0)
-        
-        # Add row to table
-        table += f"| {i+1} | {name} | {location} | {license_status} | {bond} | {projects} | {score} |\n"
+        rows.append(ROW_FMT.format(
+            rank=i + 1,
+            name=result.get("name", "Unknown"),
+            location=f"{result.get('city', 'Unknown')}, {result.get('state', '')}",
+            license=license_status,
+            bond=_fmt_bond(result.get("bond_amount")),
+            projects=result.get("tx_projects_past_5yrs", 0),
+            score=result.get("score", 0),
+        ))
     
-    return table
+    return "".join(rows)
+
+def _markdown_rows_pandas(results: List[Dict[str, Any]]) -> List[str]:
+    """Format markdown table rows column-wise with pandas (same output as ROW_FMT)"""
+    import pandas as pd
+    
+    # Columns are read with .get like the row loop, so only missing keys take a default
+    # (an explicit None is kept and rendered as "None", exactly as ROW_FMT does)
+    df = pd.DataFrame({
+        column: [result.get(column, default) for result in results]
+        for column, default in MARKDOWN_DEFAULTS.items()
+    }, dtype=object)
+    text = {column: df[column].map(str) for column in df.columns}
+    
+    # Format license status (truthiness, as in the row loop)
+    license_status = df["lic_active"].map(bool).map({True: "Active", False: "Inactive"})
+    license_status = license_status.where(
+        ~df["lic_number"].map(bool), license_status + " (" + text["lic_number"] + ")"
+    )
+    
+    rank = pd.Series(range(1, len(df) + 1), index=df.index).map(str)
+    table_rows = (
+        "| " + rank + " | " + text["name"] + " | " + text["city"] + ", " + text["state"]
+        + " | " + license_status + " | " + df["bond_amount"].map(_fmt_bond)
+        + " | " + text["tx_projects_past_5yrs"] + " | " + text["score"] + " |\n"
+    )
+    return table_rows.tolist()